@@ -1,12 +1,14 @@
 import streamlit as st
 import requests
 import json
-import pandas as pd
-from typing import List, Dict, Any
+import csv
+import io
+import threading
 import time
+import uuid
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 
 # Set page config at the very beginning before any other Streamlit commands
 st.set_page_config(
@@ -17,72 +19,210 @@ st.set_page_config(
 
 # Constants
 BACKEND_URL = "https://curvy-coins-bow.loca.lt"  # Your local tunnel URL
-TIMEOUT = 10  # Timeout in seconds
-MAX_RETRIES = 10  # Maximum number of retries for 502 errors
+CONNECT_TIMEOUT = 2  # Seconds to establish a connection to the backend
+PROBE_TIMEOUT = (CONNECT_TIMEOUT, 3)  # (connect, read) timeout for the /docs health check
+CONFIG_TIMEOUT = (CONNECT_TIMEOUT, 5)  # (connect, read) timeout for configuration updates
+SEARCH_TIMEOUT = (CONNECT_TIMEOUT, 30)  # (connect, read) timeout for search, rerank and results
+RESULTS_WAIT_FOR_RERANK = False  # Set when the backend holds /results until a pending rerank finishes
+MAX_RETRIES = 3  # Attempts the session adapter makes on connect errors and 502/503/504
+POOL_CONNECTIONS = 4  # Number of connection pools to cache
+POOL_MAXSIZE = 8  # Maximum number of connections kept alive per pool
+PROBE_TTL = 60  # Seconds to reuse the last backend health check
+ONE_SHOT_RETRY_TTL = 600  # Seconds before retrying the fused search route after the app 404s it
+SEARCH_CACHE_TTL = 300  # Seconds to reuse results for an identical query and configuration
+SEARCH_CACHE_ENTRIES = 64  # Maximum number of cached searches
+QUERY_CACHE_TTL = 300  # Seconds to serve a retyped query from the session cache
+JSON_HEADERS = {"Content-Type": "application/json"}  # Headers for pre-encoded JSON bodies
+RETRIEVAL_WEIGHTS = ("Mixed", "Semantic", "Keyword")  # Radio options for retrieval weight
+RETRIEVAL_WEIGHT_INDEX = {weight: i for i, weight in enumerate(RETRIEVAL_WEIGHTS)}
+RESULT_CSV_FIELDS = ["correlation", "tokens", "content", "metadata"]  # Download column order
+# Page styling, injected on every rerun by main()
+PAGE_CSS = """
+    <style>
+    .stButton > button, .stFormSubmitButton > button {
+        width: 100%;
+        border-radius: 5px;
+        height: 3em;
+    }
+    .stExpander {
+        border: 1px solid #ddd;
+        border-radius: 5px;
+        margin-bottom: 1em;
+    }
+    </style>
+"""
 
-def create_retry_session():
-    """Create a requests session with retry strategy"""
+@st.cache_resource
+def get_session():
+    """Return the requests session shared by every Streamlit session and rerun"""
     session = requests.Session()
+    # Read timeouts are not retried: the backend may still be working on the request
     retry_strategy = Retry(
         total=MAX_RETRIES,
-        backoff_factor=0.5,
-        status_forcelist=[502, 503, 504],
+        connect=2,
+        read=False,
+        backoff_factor=0.3,
+        backoff_jitter=0.2,
+        status_forcelist={502, 503, 504},
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry_strategy
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": "vectorsearch-ui",
+        "Accept": "application/json"
+    })
     return session
 
-def with_retry(func):
-    """Decorator to add retry logic to requests"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        session = create_retry_session()
-        attempt = 0
-        last_exception = None
-        
-        while attempt < MAX_RETRIES:
-            try:
-                kwargs['session'] = session
-                return func(*args, **kwargs)
-            except requests.exceptions.RequestException as e:
-                attempt += 1
-                last_exception = e
-                if attempt < MAX_RETRIES:
-                    time.sleep(0.5 * attempt)  # Exponential backoff
-                    st.warning(f"Retry attempt {attempt}/{MAX_RETRIES}")
-                continue
-            break
-        
-        raise last_exception
-    return wrapper
+def _describe_error(error):
+    """Describe a request failure, noting when the adapter used up its retries"""
+    if isinstance(error, requests.exceptions.RetryError):
+        return f"backend still failing after {MAX_RETRIES} retries"
+    return str(error)
+
+def _json_body(payload):
+    """Encode a request body as compact JSON, without the spaces requests' json= adds"""
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+@st.cache_resource
+def _backend_status():
+    """Last known backend health, shared across sessions and updated by background probes"""
+    return {
+        "ok": None,
+        "message": "⏳ Checking backend connection...",
+        "checked_at": 0.0,
+        "probing": False,
+        "thread": None,
+        "lock": threading.Lock()
+    }
+
+def _probe_backend(url, session, status):
+    """Probe the backend docs page and record the outcome; runs off the script thread"""
+    try:
+        response = session.head(f"{url}/docs", timeout=PROBE_TIMEOUT)
+        if response.status_code == 200:
+            ok, message = True, "✅ Backend connected"
+        else:
+            ok, message = False, f"❌ Backend connection failed with status code: {response.status_code}"
+    except Exception as e:
+        ok, message = False, f"❌ Backend connection error: {_describe_error(e)}"
+    with status["lock"]:
+        status.update(ok=ok, message=message, checked_at=time.time(), probing=False)
+
+def _refresh_backend_status(url, session, force=False):
+    """Start a background probe if the last one is older than PROBE_TTL and none is running"""
+    status = _backend_status()
+    with status["lock"]:
+        if status["probing"] or (not force and time.time() - status["checked_at"] < PROBE_TTL):
+            return status
+        status["probing"] = True
+        # Started under the lock so a concurrent Recheck never joins an unstarted thread
+        status["thread"] = threading.Thread(
+            target=_probe_backend, args=(url, session, status), daemon=True
+        )
+        status["thread"].start()
+    return status
+
+@st.cache_resource
+def _backend_features():
+    """Optional backend routes, discovered at runtime and shared by every session"""
+    return {"one_shot_missing_at": None}
+
+def _is_route_missing(response):
+    """True only for the app's own 404; the tunnel answers a bare 404 while disconnected"""
+    try:
+        return response.json() == {"detail": "Not Found"}
+    except ValueError:
+        return False
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _results_csv(results_version, _results):
+    """Build the CSV download once per search; results_version identifies the result set"""
+    # Known columns first, then any extra fields the backend returns, as pandas used to
+    fieldnames = list(RESULT_CSV_FIELDS)
+    for result in _results:
+        fieldnames.extend(key for key in result if key not in fieldnames)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for result in _results:
+        writer.writerow({**result, "metadata": json.dumps(result.get("metadata") or {})})
+    return buffer.getvalue().encode("utf-8")
+
+def _format_result(index, result):
+    """Format one result's expander title and markdown body"""
+    title = f"📄 Result {index} - Correlation: {result['correlation']:.2f} - Tokens: {result['tokens']}"
+    body = f"**Content:**\n{result['content']}"
+    if result.get('metadata'):
+        body += "\n\n**Metadata:**\n" + "\n".join(
+            f"- {key}: {value}" for key, value in result['metadata'].items()
+        )
+    return title, body
+
+def _normalize_query(query):
+    """Fold case and whitespace so trivially retyped queries compare equal"""
+    return " ".join(query.lower().split())
+
+class RerankFailedError(Exception):
+    """Raised when the search succeeded but reranking didn't; carries the original results"""
+
+    def __init__(self, results):
+        super().__init__("Reranking failed")
+        self.results = results
+
+@st.cache_data(ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_ENTRIES, show_spinner=False)
+def _search(query, config_key, _ui, _on_stage=None):
+    """Run the search pipeline, reusing results for repeated (query, config) pairs"""
+    config = json.loads(config_key)
+    results, reranked = _ui.run_search_pipeline(query, config["rerank_enabled"], _on_stage)
+    if not reranked:
+        # Exceptions aren't cached, so a transient rerank failure isn't served to every session
+        raise RerankFailedError(results)
+    return results, reranked
 
 class VectorSearchUI:
     def __init__(self):
+        self.session = get_session()
         self.initialize_session_state()
-        self.check_backend_connection()
 
-    @with_retry
-    def check_backend_connection(self, session=None):
-        try:
-            with st.spinner("Checking backend connection..."):
-                response = session.get(
-                    f"{BACKEND_URL}/docs",
-                    timeout=TIMEOUT,
-                    headers={"Connection": "close"}
-                )
-                if response.status_code == 200:
-                    st.sidebar.success("✅ Backend connected")
-                else:
-                    st.sidebar.error(f"❌ Backend connection failed with status code: {response.status_code}")
-                    st.sidebar.info("Check if the backend API is responding correctly")
-        except Exception as e:
-            st.sidebar.error(f"❌ Backend connection error: {str(e)}")
-            st.sidebar.info("Unexpected error occurred while connecting to the backend")
+    def check_backend_connection(self):
+        # Paint the last known status right away; a stale one is refreshed in the background
+        # and finish_backend_badge repaints this slot once the rest of the page is out
+        self.badge = st.sidebar.empty()
+        if st.sidebar.button("Recheck"):
+            self.paint_backend_badge(_refresh_backend_status(BACKEND_URL, self.session, force=True))
+        else:
+            self.paint_backend_badge(_refresh_backend_status(BACKEND_URL, self.session))
+
+    def paint_backend_badge(self, status):
+        if status["ok"] is None:
+            self.badge.info(status["message"])
+        elif status["ok"]:
+            self.badge.success(status["message"])
+        else:
+            self.badge.error(f"{status['message']}\n\nCheck if the backend API is responding correctly")
+
+    def finish_backend_badge(self):
+        """Wait out an in-flight probe after the page is painted, then repaint the badge once"""
+        status = _backend_status()
+        if status["probing"]:
+            status["thread"].join(timeout=sum(PROBE_TIMEOUT))
+            self.paint_backend_badge(status)
 
     def initialize_session_state(self):
         if 'search_results' not in st.session_state:
             st.session_state.search_results = []
+        if 'results_version' not in st.session_state:
+            st.session_state.results_version = None
+        if 'query_cache' not in st.session_state:
+            st.session_state.query_cache = []
         if 'search_config' not in st.session_state:
             st.session_state.search_config = {
                 "doc_correlation": 0.85,
@@ -92,63 +232,68 @@ class VectorSearchUI:
                 "rerank_enabled": False
             }
 
-    @with_retry
-    def update_configuration(self, config_data, session=None):
-        response = session.post(
+    def update_configuration(self, config_data):
+        response = self.session.post(
             f"{BACKEND_URL}/vector-search/configure",
-            params=config_data,
-            timeout=TIMEOUT,
-            headers={"Connection": "close"}
+            data=_json_body(config_data),
+            headers=JSON_HEADERS,
+            timeout=CONFIG_TIMEOUT
         )
         return response
 
     def render_configuration_panel(self):
         st.sidebar.header("Vector Search Configuration")
+        # Single slot for configuration feedback so each update replaces the last one
+        status = st.sidebar.empty()
 
         with st.sidebar.expander("Current Backend URL", expanded=False):
             st.code(BACKEND_URL)
 
-        doc_correlation = st.sidebar.slider(
-            "Doc Correlation",
-            min_value=0.0,
-            max_value=1.0,
-            value=st.session_state.search_config["doc_correlation"],
-            step=0.05
-        )
+        # Widgets inside a form don't rerun the script until the form is submitted
+        with st.sidebar.form("config_form"):
+            doc_correlation = st.slider(
+                "Doc Correlation",
+                min_value=0.0,
+                max_value=1.0,
+                value=st.session_state.search_config["doc_correlation"],
+                step=0.05
+            )
 
-        recall_number = st.sidebar.slider(
-            "Recall Number",
-            min_value=1,
-            max_value=50,
-            value=st.session_state.search_config["recall_number"]
-        )
+            recall_number = st.slider(
+                "Recall Number",
+                min_value=1,
+                max_value=50,
+                value=st.session_state.search_config["recall_number"]
+            )
 
-        retrieval_weight = st.sidebar.radio(
-            "Knowledge Retrieval Weight",
-            options=["Mixed", "Semantic", "Keyword"],
-            index=["Mixed", "Semantic", "Keyword"].index(st.session_state.search_config["retrieval_weight"])
-        )
+            retrieval_weight = st.radio(
+                "Knowledge Retrieval Weight",
+                options=RETRIEVAL_WEIGHTS,
+                index=RETRIEVAL_WEIGHT_INDEX[st.session_state.search_config["retrieval_weight"]]
+            )
 
-        mixed_percentage = None
-        if retrieval_weight == "Mixed":
-            mixed_percentage = st.sidebar.slider(
+            # Always shown since the form can't react to the radio before submit
+            mixed_percentage = st.slider(
                 "Mixed Percentage",
                 min_value=0,
                 max_value=100,
-                value=st.session_state.search_config["mixed_percentage"]
+                value=st.session_state.search_config["mixed_percentage"],
+                help="Only used when the retrieval weight is Mixed"
             )
 
-        rerank_enabled = st.sidebar.checkbox(
-            "Enable Rerank Model",
-            value=st.session_state.search_config["rerank_enabled"]
-        )
+            rerank_enabled = st.checkbox(
+                "Enable Rerank Model",
+                value=st.session_state.search_config["rerank_enabled"]
+            )
+
+            apply_button = st.form_submit_button("Apply Configuration")
 
-        if st.sidebar.button("Apply Configuration"):
+        if apply_button:
             config_data = {
                 "doc_correlation": doc_correlation,
                 "recall_number": recall_number,
                 "retrieval_weight": retrieval_weight,
-                "mixed_percentage": mixed_percentage if mixed_percentage is not None else 50,
+                "mixed_percentage": mixed_percentage if retrieval_weight == "Mixed" else 50,
                 "rerank_enabled": rerank_enabled
             }
             
@@ -157,131 +302,246 @@ class VectorSearchUI:
                     response = self.update_configuration(config_data)
                     if response.status_code == 200:
                         st.session_state.search_config = config_data
-                        st.sidebar.success("✅ Configuration updated successfully!")
+                        # Cached results may predate what the backend is actually configured with
+                        _search.clear()
+                        st.session_state.query_cache = []
+                        status.success("✅ Configuration updated successfully!")
                     else:
-                        st.sidebar.error(f"❌ Error updating configuration: {response.text}")
+                        status.error(f"❌ Error updating configuration: {response.text}")
                 except Exception as e:
-                    st.sidebar.error(f"❌ Error: {str(e)}")
+                    status.error(f"❌ Error: {_describe_error(e)}")
 
-    @with_retry
-    def perform_search(self, query, session=None):
+    def perform_search(self, query, on_stage=None):
         # First submit the query
-        submit_response = session.post(
+        if on_stage:
+            on_stage("Submitting query...")
+        submit_response = self.session.post(
             f"{BACKEND_URL}/query/submit",
-            json={"query": query},
-            timeout=30
+            data=_json_body({"query": query}),
+            headers=JSON_HEADERS,
+            timeout=SEARCH_TIMEOUT
         )
         if submit_response.status_code != 200:
             raise Exception(f"Query submission failed: {submit_response.text}")
 
         # Then perform the retrieval
-        retrieve_response = session.post(
+        if on_stage:
+            on_stage("Retrieving documents...")
+        retrieve_response = self.session.post(
             f"{BACKEND_URL}/query/retrieve",
-            timeout=30
+            timeout=SEARCH_TIMEOUT
         )
         if retrieve_response.status_code != 200:
             raise Exception(f"Query retrieval failed: {retrieve_response.text}")
 
-        return retrieve_response.json()
+        return retrieve_response
 
-    @with_retry
-    def perform_rerank(self, session=None):
-        response = session.post(
+    def perform_rerank(self):
+        response = self.session.post(
             f"{BACKEND_URL}/vector-search/rerank",
-            timeout=TIMEOUT,
-            headers={"Connection": "close"}
+            timeout=SEARCH_TIMEOUT
         )
         return response
 
-    @with_retry
-    def get_results(self, session=None):
-        response = session.get(
+    def get_results(self):
+        response = self.session.get(
             f"{BACKEND_URL}/vector-search/results",
-            timeout=TIMEOUT,
-            headers={"Connection": "close"}
+            timeout=SEARCH_TIMEOUT,
+            stream=True
         )
         return response
 
+    def perform_search_one_shot(self, query, rerank_enabled):
+        response = self.session.post(
+            f"{BACKEND_URL}/vector-search/search",
+            params={"query": query, "rerank": str(rerank_enabled).lower()},
+            timeout=SEARCH_TIMEOUT,
+            stream=True
+        )
+        return response
+
+    def run_search_pipeline(self, query, rerank_enabled, on_stage=None):
+        """Run the search in one call when the backend supports it, else stage by stage"""
+        features = _backend_features()
+        missing_at = features["one_shot_missing_at"]
+        if missing_at is None or time.time() - missing_at >= ONE_SHOT_RETRY_TTL:
+            response = self.perform_search_one_shot(query, rerank_enabled)
+            if response.status_code == 200:
+                return self.stream_results(response), True
+            try:
+                route_missing = response.status_code == 404 and _is_route_missing(response)
+            finally:
+                response.close()
+            if not route_missing:
+                raise Exception(f"Search failed with status code: {response.status_code}")
+            # Older backends lack the fused route; use the staged calls until the TTL lapses
+            features["one_shot_missing_at"] = time.time()
+
+        # Each stage reads state the previous one left on the backend, so they can't be
+        # issued concurrently unless the backend serializes them itself
+        self.perform_search(query, on_stage)
+
+        # Rerank only when enabled; a failed rerank still falls through to the results
+        reranked = True
+        if rerank_enabled and RESULTS_WAIT_FOR_RERANK:
+            # /results long-polls until the rerank lands, so both requests can be in flight
+            if on_stage:
+                on_stage("Reranking and fetching results...")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                rerank_future = executor.submit(self.perform_rerank)
+                results_future = executor.submit(self.get_results)
+            # Both calls have finished once the executor exits
+            try:
+                reranked = rerank_future.result().status_code == 200
+            except Exception:
+                # Release the streamed results connection back to the pool before re-raising
+                if results_future.exception() is None:
+                    results_future.result().close()
+                raise
+            results_response = results_future.result()
+        else:
+            if rerank_enabled:
+                if on_stage:
+                    on_stage("Reranking results...")
+                reranked = self.perform_rerank().status_code == 200
+            if on_stage:
+                on_stage("Fetching results...")
+            results_response = self.get_results()
+
+        if results_response.status_code != 200:
+            # Release the streamed connection back to the pool before bailing out
+            results_response.close()
+            raise Exception("Failed to fetch search results")
+
+        return self.stream_results(results_response), reranked
+
+    def stream_results(self, response):
+        """Parse the results list straight off the response stream"""
+        # Imported here so cold starts that never search skip ijson's backend probing
+        import ijson
+
+        try:
+            response.raw.decode_content = True
+            results = next(ijson.items(response.raw, "results", use_float=True), None)
+        finally:
+            response.close()
+        if not isinstance(results, list):
+            raise Exception("Malformed search response: missing 'results' list")
+        return results
+
+    def lookup_query_cache(self, query, config_key):
+        """Return the cached search for the same folded query under the same configuration"""
+        now = time.time()
+        st.session_state.query_cache = [
+            entry for entry in st.session_state.query_cache
+            if now - entry["timestamp"] < QUERY_CACHE_TTL
+        ]
+        normalized = _normalize_query(query)
+        # Exact match only: a changed year or an added "not" is a different question
+        for entry in st.session_state.query_cache:
+            if entry["config_key"] == config_key and entry["query"] == normalized:
+                return entry["search"]
+        return None
+
+    def store_query_cache(self, query, config_key, search):
+        """Remember a search, replacing any entry for the same query and configuration"""
+        normalized = _normalize_query(query)
+        st.session_state.query_cache = [
+            entry for entry in st.session_state.query_cache
+            if entry["config_key"] != config_key or entry["query"] != normalized
+        ]
+        _, reranked = search
+        if not reranked:
+            # Degraded results shouldn't outlive the transient failure that produced them
+            return
+        st.session_state.query_cache.append({
+            "query": normalized,
+            "config_key": config_key,
+            "search": search,
+            "timestamp": time.time()
+        })
+
     def render_search_interface(self):
         st.title("Vector Search Interface")
         st.subheader("Search")
         
-        col1, col2 = st.columns([4, 1])
-        with col1:
-            query = st.text_input("Enter your search query:", key="search_query")
-        with col2:
-            search_button = st.button("🔍 Search")
+        # Typing doesn't rerun the script; only pressing Search submits the form
+        with st.form("search_form", clear_on_submit=False):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                query = st.text_input("Enter your search query:", key="search_query")
+            with col2:
+                search_button = st.form_submit_button("🔍 Search")
+            bypass_cache = st.checkbox("Bypass cache", help="Always query the backend for this search")
 
         if search_button and query:
-            with st.spinner("Searching..."):
+            with st.status("Searching...") as status:
                 try:
-                    # Perform the search with automatic retries
-                    search_results = self.perform_search(query)
-                    
-                    # If rerank is enabled, call the rerank endpoint
-                    if st.session_state.search_config["rerank_enabled"]:
-                        with st.spinner("Reranking results..."):
-                            rerank_response = self.perform_rerank()
-                            if rerank_response.status_code != 200:
-                                st.warning("⚠️ Reranking failed, showing original results.")
-                    
-                    # Get the final results
-                    results_response = self.get_results()
-                    if results_response.status_code == 200:
-                        st.session_state.search_results = results_response.json()["results"]
-                        st.success(f"✨ Found {len(st.session_state.search_results)} results")
+                    config_key = json.dumps(st.session_state.search_config, sort_keys=True)
+                    # Only fires when the pipeline actually runs; cache hits finish immediately
+                    on_stage = lambda label: status.update(label=label)
+                    if bypass_cache:
+                        search = self.run_search_pipeline(
+                            query, st.session_state.search_config["rerank_enabled"], on_stage
+                        )
+                        self.store_query_cache(query, config_key, search)
                     else:
-                        st.error("❌ Failed to fetch search results")
-                
+                        search = self.lookup_query_cache(query, config_key)
+                        if search is None:
+                            try:
+                                search = _search(query, config_key, self, on_stage)
+                            except RerankFailedError as e:
+                                search = (e.results, False)
+                            self.store_query_cache(query, config_key, search)
+                    results, reranked = search
+                    if not reranked:
+                        st.warning("⚠️ Reranking failed, showing original results.")
+
+                    st.session_state.search_results = results
+                    st.session_state.results_version = uuid.uuid4().hex
+                    status.update(
+                        label=f"✨ Found {len(results)} results",
+                        state="complete",
+                        expanded=not reranked
+                    )
+
                 except Exception as e:
-                    st.error(f"❌ Error performing search: {str(e)}")
+                    status.update(label="❌ Search failed", state="error", expanded=True)
+                    st.error(f"❌ Error performing search: {_describe_error(e)}")
 
     def render_results(self):
         if st.session_state.search_results:
             st.subheader("Search Results")
             
-            df = pd.DataFrame(st.session_state.search_results)
-            csv = df.to_csv(index=False)
+            csv_data = _results_csv(
+                st.session_state.results_version,
+                st.session_state.search_results
+            )
             st.download_button(
                 label="📥 Download Results",
-                data=csv,
+                data=csv_data,
                 file_name="search_results.csv",
                 mime="text/csv",
             )
             
             for idx, result in enumerate(st.session_state.search_results, 1):
-                with st.expander(
-                    f"📄 Result {idx} - Correlation: {result['correlation']:.2f} - Tokens: {result['tokens']}"
-                ):
-                    st.markdown(f"**Content:**\n{result['content']}")
-                    if result.get('metadata'):
-                        st.markdown("**Metadata:**")
-                        for key, value in result['metadata'].items():
-                            st.markdown(f"- {key}: {value}")
+                title, body = _format_result(idx, result)
+                with st.expander(title):
+                    st.markdown(body)
 
     def run(self):
+        self.check_backend_connection()
         self.render_configuration_panel()
         self.render_search_interface()
         self.render_results()
+        self.finish_backend_badge()
 
 def main():
-    st.markdown("""
-        <style>
-        .stButton > button {
-            width: 100%;
-            border-radius: 5px;
-            height: 3em;
-        }
-        .stExpander {
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            margin-bottom: 1em;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # Streamlit drops elements that aren't re-emitted, so the style tag is sent every rerun
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
     
     vector_search_ui = VectorSearchUI()
     vector_search_ui.run()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file